@@ -6,18 +6,21 @@ y validaciones específicas por farmacia.
 Adaptado 09-sep-2025
 """
 
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.keys import Keys
 
-import csv, time, re, os, unicodedata # <--- Se añade la librería unicodedata
-from os.path import exists
+import aiohttp, cachetools, orjson
+import asyncio, csv, functools, os, queue, re, shelve, time, unicodedata # <--- Se añade la librería unicodedata
+import multiprocessing, signal, traceback
+from collections import defaultdict
+from multiprocessing.util import Finalize
+from urllib.parse import quote
 from datetime import datetime
 
 # --------------------------------------------------------------------
@@ -44,27 +47,32 @@ PRODUCTOS_A_BUSCAR = {
 }
 
 FARMACIAS_A_BUSCAR = ["cruzverde_co", "farmatodo_co", "larebaja_co", "locatel_co", "colsubsidio_co", "cafam_co", "olimpica_co", "pasteur_co"]
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 # --------------------------------------------------------------------
 
 
 # --------------------------------------------------------------------
 # 1. UTILIDADES
 # --------------------------------------------------------------------
+_NONDIGIT = re.compile(r'[^0-9]')
+
 def normalizar_precio(raw_price: str) -> int:
     """Función de normalización general para la mayoría de farmacias."""
     if not raw_price:
         return 0
-    return int(re.sub(r'[^0-9]', '', raw_price) or 0)
+    return int(_NONDIGIT.sub('', raw_price) or 0)
 
 def normalizar_precio_cafam(raw_price: str) -> int:
     """Normaliza el precio de Cafam, ignorando los centavos después de la coma."""
     main_price_part = raw_price.split(',')[0]
-    return int(re.sub(r'[^0-9]', '', main_price_part) or 0)
+    return int(_NONDIGIT.sub('', main_price_part) or 0)
 
 def fecha_hoy_fmt() -> str:
     return datetime.now().strftime("%d/%m/%Y")
 
 # --- FUNCIÓN DE NORMALIZACIÓN DE TEXTO MEJORADA ---
+@functools.lru_cache(maxsize=8192)
 def normalizar_texto_para_comparacion(texto: str) -> str:
     """
     Normaliza un texto para hacerlo apto para comparaciones flexibles:
@@ -82,388 +90,675 @@ def normalizar_texto_para_comparacion(texto: str) -> str:
     return texto_sin_tildes.lower().replace(" ", "")
 
 # --- FUNCIÓN DE VALIDACIÓN ACTUALIZADA ---
-def validar_nombre_producto(nombre_producto: str, keyword: str) -> bool:
+def validar_nombre_producto(nombre_producto: str, keyword_normalizada: str) -> bool:
     """
     Verifica si la palabra clave está en el nombre del producto de forma flexible,
     utilizando la nueva función de normalización de texto.
-    Ej: keyword 'Cebión' encontrará 'CEBION' o 'cebion' en el nombre_producto.
+    La palabra clave ya debe venir normalizada (ver NORM_KEYWORDS).
+    Ej: keyword 'cebion' encontrará 'CEBIÓN' o 'Cebion' en el nombre_producto.
     """
-    if not nombre_producto or not keyword:
+    if not nombre_producto or not keyword_normalizada:
         return False
-    # Utiliza la nueva función de normalización para ambas cadenas
-    keyword_normalizada = normalizar_texto_para_comparacion(keyword)
     nombre_normalizado = normalizar_texto_para_comparacion(nombre_producto)
     
     return keyword_normalizada in nombre_normalizado
 
+# Palabras clave normalizadas una sola vez por EAN.
+NORM_KEYWORDS = {ean: normalizar_texto_para_comparacion(k) for ean, k in PRODUCTOS_A_BUSCAR.items()}
+
 # --------------------------------------------------------------------
 # 2. CONFIGURACIÓN DE SITIOS
 # --------------------------------------------------------------------
 SITE_CONFIG = {
     "cruzverde_co": {
         "search_url": "https://www.cruzverde.com.co/search?query={q}",
+        "timeout": 10,
         "container": {"by": By.TAG_NAME, "value": "ml-card-product"},
     },
     "farmatodo_co": {
         "search_url": "https://www.farmatodo.com.co/buscar?product={q}",
-        "primary_container": {"by": By.CSS_SELECTOR, "value": "div[data-testid='product-card']"},
-        "fallback_container": {"by": By.TAG_NAME, "value": "app-new-product-card"},
+        "timeout": 10,
+        # Búsqueda JSON para saber si hay resultados antes de abrir Selenium (ver has_results).
+        # Se espera {"total": N}. Si el endpoint no responde así, has_results lo avisa una vez
+        # y no se descarta ningún EAN de este sitio.
+        "check_url": "https://www.farmatodo.com.co/api/search?product={q}",
+        # Tarjeta nueva o la de respaldo, en una sola consulta.
+        "container": {"by": By.CSS_SELECTOR, "value": "div[data-testid='product-card'], app-new-product-card"},
     },
     "larebaja_co": {
-        "search_url": "https://www.larebajavirtual.com/{q}?_q={q}&map=ft",
-        "selectors": {
-            "nombre": {"by": By.CSS_SELECTOR, "value": "h3.vtex-product-summary-2-x-productNameContainer"},
-            "marca": {"by": By.CSS_SELECTOR, "value": "span.vtex-store-components-3-x-productBrandName"},
-            "p_online": {"by": By.CSS_SELECTOR, "value": "span.vtex-product-price-1-x-sellingPrice"},
-            "p_normal": {"by": By.CSS_SELECTOR, "value": "span.vtex-product-price-1-x-listPrice"}
-        }
+        "vtex_host": "www.larebajavirtual.com",
+        "timeout": 8,
     },
     "locatel_co": {
-        "search_url": "https://www.locatelcolombia.com/{q}?_q={q}&map=ft",
-        "selectors": {
-            "nombre": {"by": By.CSS_SELECTOR, "value": "h2.vtex-product-summary-2-x-productNameContainer"},
-            "p_online": {"by": By.CSS_SELECTOR, "value": "span.vtex-store-components-3-x-sellingPrice"},
-            "p_normal": {"by": By.CSS_SELECTOR, "value": "div.vtex-store-components-3-x-listPrice"}
-        }
+        "vtex_host": "www.locatelcolombia.com",
+        "timeout": 8,
     },
     "colsubsidio_co": {
         "search_url": "https://www.drogueriascolsubsidio.com/{q}",
+        "timeout": 10,
         "container": {"by": By.CSS_SELECTOR, "value": "div.product-Vitrina-masVendidos"}
     },
     "cafam_co": {
         "search_url": "https://www.drogueriascafam.com.co/#2fce/fullscreen/m=and&q={q}",
-        "container": {"by": By.CSS_SELECTOR, "value": "div.dfd-card"},
-        "selectors": {
-            "nombre": {"by": By.CSS_SELECTOR, "value": "div.dfd-card-title"},
-            "p_online": {"by": By.CSS_SELECTOR, "value": "span.dfd-card-special-price"},
-            "p_sale": {"by": By.CSS_SELECTOR, "value": "span.dfd-card-price--sale"},
-            "p_normal": {"by": By.CSS_SELECTOR, "value": "span.dfd-card-price"}
-        }
+        "timeout": 15,
+        # Primera tarjeta que ya tiene el nombre renderizado.
+        "container": {"by": By.CSS_SELECTOR, "value": "div.dfd-card:has(div.dfd-card-title)"},
     },
     "olimpica_co": {
-        "search_url": "https://www.olimpica.com/{q}?_q={q}&map=ft",
-        "selectors": {
-            "nombre": {"by": By.CSS_SELECTOR, "value": "h3.vtex-product-summary-2-x-productNameContainer"},
-            "marca": {"by": By.CSS_SELECTOR, "value": "span.vtex-product-summary-2-x-productBrandName"},
-            "p_online": {"by": By.CSS_SELECTOR, "value": "div.olimpica-dinamic-flags-0-x-listPrices"},
-            "p_normal": {"by": By.CSS_SELECTOR, "value": "span.vtex-product-price-1-x-sellingPrice--summary"}
-        }
+        "vtex_host": "www.olimpica.com",
+        "timeout": 8,
     },
     "pasteur_co": {
-        "search_url": "https://www.farmaciaspasteur.com.co/{q}?_q={q}&map=ft",
-        "container": {"by": By.CSS_SELECTOR, "value": "section.vtex-product-summary-2-x-container"},
-        "selectors": {
-            "nombre": {"by": By.CSS_SELECTOR, "value": "h4.vtex-product-summary-2-x-productNameContainer"},
-            "p_online": {"by": By.CSS_SELECTOR, "value": "span.vtex-product-price-1-x-sellingPriceValue"},
-            "p_normal": {"by": By.CSS_SELECTOR, "value": "span.vtex-product-price-1-x-listPriceValue"}
-        }
+        "vtex_host": "www.farmaciaspasteur.com.co",
+        "timeout": 8,
     }
 }
 
+# Segundos de espera por defecto si el sitio no define "timeout".
+TIMEOUT_POR_DEFECTO = 15
+
+# Las tiendas VTEX se consultan por su API de catálogo; el resto necesita Selenium.
+VTEX_SITES = [f for f in FARMACIAS_A_BUSCAR if "vtex_host" in SITE_CONFIG[f]]
+SELENIUM_SITES = [f for f in FARMACIAS_A_BUSCAR if f not in VTEX_SITES]
+
 # --------------------------------------------------------------------
 # 3. FUNCIONES DE EXTRACCIÓN ESPECIALIZADAS
 # --------------------------------------------------------------------
-def _safe_find(element, by, value):
-    try: 
-        return element.find_element(by, value).text.strip()
-    except NoSuchElementException: 
-        return None
-
-def extraer_datos_olimpica(driver, selectors):
-    nombre = _safe_find(driver, selectors['nombre']['by'], selectors['nombre']['value']) or "N/A"
-    marca = _safe_find(driver, selectors['marca']['by'], selectors['marca']['value']) or "N/A"
-    p_online = _safe_find(driver, selectors['p_online']['by'], selectors['p_online']['value'])
-    p_normal = _safe_find(driver, selectors['p_normal']['by'], selectors['p_normal']['value'])
-    if not p_online: p_online = p_normal
-    if not p_normal: p_normal = p_online
-    p_online = p_online or "0"
-    p_normal = p_normal or "0"
-    return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
-
-def extraer_datos_pasteur(item, selectors):
-    nombre = _safe_find(item, selectors['nombre']['by'], selectors['nombre']['value']) or "N/A"
-    marca = nombre.split()[0] if nombre != "N/A" else "N/A"
-    p_online = _safe_find(item, selectors['p_online']['by'], selectors['p_online']['value'])
-    p_normal = _safe_find(item, selectors['p_normal']['by'], selectors['p_normal']['value'])
-    if not p_normal: p_normal = p_online
-    p_online = p_online or "0"
-    p_normal = p_normal or "0"
-    return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
-
-def extraer_datos_cruzverde(item):
-    nombre_bruto, fabricante, marca, p_online, p_normal = "N/A", "N/A", "N/A", "0", "0"
-    try:
-        elements = item.find_elements(By.TAG_NAME, "div") + item.find_elements(By.TAG_NAME, "p")
-        candidatos_nombre = [elem.text.strip() for elem in elements if elem.text.strip() and len(elem.text.strip()) > 10 and "$" not in elem.text]
-        if candidatos_nombre: nombre_bruto = max(candidatos_nombre, key=len)
-    except: pass
-    try:
-        fabricante = item.find_element(By.CSS_SELECTOR, "div.italic").text.strip()
-    except: pass
-    
-    nombre_limpio = nombre_bruto.replace(fabricante, "").replace('\n', ' ').strip()
-    if nombre_limpio != "N/A":
-        marca = nombre_limpio.split()[0]
-
-    try:
-        elements = item.find_elements(By.TAG_NAME, "span") + item.find_elements(By.TAG_NAME, "p")
-        for elem in elements:
-            text = elem.text.strip()
-            if "$" in text and len(re.sub(r'[^0-9]', '', text)) >= 4:
-                if "Normal" in text: p_normal = text
-                elif p_online == "0": p_online = text
-    except: pass
-    return {"nombre": nombre_limpio, "marca": marca, "p_online": p_online, "p_normal": p_normal}
-
-def extraer_datos_farmatodo(item):
-    marca = _safe_find(item, By.CSS_SELECTOR, "p.text-brand") or "N/A"
-    nombre = _safe_find(item, By.CSS_SELECTOR, "p.text-title") or "N/A"
-    p_online = _safe_find(item, By.CSS_SELECTOR, "span.price__text-price") or "0"
-    p_normal = _safe_find(item, By.CSS_SELECTOR, "span.price__text-offer-price") or "0"
-    return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
-
-def extraer_datos_larebaja(driver, selectors):
-    nombre = _safe_find(driver, selectors['nombre']['by'], selectors['nombre']['value']) or "N/A"
-    marca = _safe_find(driver, selectors['marca']['by'], selectors['marca']['value']) or "N/A"
-    p_online = _safe_find(driver, selectors['p_online']['by'], selectors['p_online']['value']) or "0"
-    p_normal = _safe_find(driver, selectors['p_normal']['by'], selectors['p_normal']['value']) or p_online
-    return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
-
-def extraer_datos_locatel(driver, selectors):
-    nombre = _safe_find(driver, selectors['nombre']['by'], selectors['nombre']['value']) or "N/A"
-    marca = nombre.split()[0] if nombre != "N/A" else "N/A"
-    p_online = _safe_find(driver, selectors['p_online']['by'], selectors['p_online']['value']) or "0"
-    p_normal = _safe_find(driver, selectors['p_normal']['by'], selectors['p_normal']['value']) or p_online
-    return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
+# Cada extractor corre dentro del navegador sobre la tarjeta (arguments[0]) y devuelve
+# {nombre, marca, p_online, p_normal} en una sola llamada a execute_script.
+# t() lee textContent (sin cálculo de layout ni chequeo de visibilidad) y colapsa espacios.
+_JS_PRELUDIO = """
+const r = arguments[0];
+const t = s => { const e = r.querySelector(s); return e ? e.textContent.replace(/\\s+/g, ' ').trim() : ''; };
+const primeraPalabra = n => n !== 'N/A' ? n.split(/\\s+/)[0] : 'N/A';
+"""
 
-def extraer_datos_colsubsidio(item):
-    nombre = _safe_find(item, By.CSS_SELECTOR, "p.dataproducto-nameProduct") or "N/A"
-    marca = nombre.split()[0] if nombre != "N/A" else "N/A"
-    p_online = _safe_find(item, By.CSS_SELECTOR, "p.dataproducto-bestPrice") or "0"
-    p_normal_raw = _safe_find(item, By.CSS_SELECTOR, "div.precioTachadoVitrina")
-    p_normal = p_normal_raw if p_normal_raw else p_online
-    return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
+JS_BY_SITE = {
+    "cruzverde_co": _JS_PRELUDIO + """
+let nombre = 'N/A';
+for (const e of [...r.querySelectorAll('div'), ...r.querySelectorAll('p')]) {
+    const s = e.innerText.trim();
+    if (s.length > 10 && !s.includes('$') && (nombre === 'N/A' || s.length > nombre.length)) nombre = s;
+}
+const fab = r.querySelector('div.italic');
+const fabricante = fab ? fab.innerText.trim() : 'N/A';
+nombre = nombre.split(fabricante).join('').split('\\n').join(' ').trim();
+let p_online = '0', p_normal = '0';
+for (const e of [...r.querySelectorAll('span'), ...r.querySelectorAll('p')]) {
+    const s = e.innerText.trim();
+    if (s.includes('$') && s.replace(/[^0-9]/g, '').length >= 4) {
+        if (s.includes('Normal')) p_normal = s;
+        else if (p_online === '0') p_online = s;
+    }
+}
+return {nombre: nombre, marca: primeraPalabra(nombre), p_online: p_online, p_normal: p_normal};
+""",
+    "farmatodo_co": _JS_PRELUDIO + """
+return {nombre: t('p.text-title') || 'N/A', marca: t('p.text-brand') || 'N/A',
+        p_online: t('span.price__text-price') || '0', p_normal: t('span.price__text-offer-price') || '0'};
+""",
+    "colsubsidio_co": _JS_PRELUDIO + """
+const nombre = t('p.dataproducto-nameProduct') || 'N/A';
+const p_online = t('p.dataproducto-bestPrice') || '0';
+return {nombre: nombre, marca: primeraPalabra(nombre), p_online: p_online,
+        p_normal: t('div.precioTachadoVitrina') || p_online};
+""",
+    "cafam_co": _JS_PRELUDIO + """
+const nombre = t('div.dfd-card-title') || 'N/A';
+const p_normal_raw = t('span.dfd-card-price');
+const p_online = t('span.dfd-card-special-price') || t('span.dfd-card-price--sale') || p_normal_raw || '0';
+return {nombre: nombre, marca: primeraPalabra(nombre), p_online: p_online, p_normal: p_normal_raw || p_online};
+""",
+}
 
-def extraer_datos_cafam(item):
-    selectors = SITE_CONFIG["cafam_co"]["selectors"]
-    nombre = _safe_find(item, selectors['nombre']['by'], selectors['nombre']['value']) or "N/A"
-    marca = nombre.split()[0] if nombre != "N/A" else "N/A"
-    p_online_raw = (_safe_find(item, selectors['p_online']['by'], selectors['p_online']['value']) or
-                    _safe_find(item, selectors['p_sale']['by'], selectors['p_sale']['value']))
-    p_normal_raw = _safe_find(item, selectors['p_normal']['by'], selectors['p_normal']['value'])
-    p_online = p_online_raw if p_online_raw else p_normal_raw or "0"
-    p_normal = p_normal_raw if p_normal_raw else p_online
+def extraer_datos_vtex(productos, ean_producto):
+    """Toma los datos del JSON de la API de catálogo VTEX (lista de productos)."""
+    if not productos:
+        return {}
+    if not isinstance(productos, list):
+        raise ValueError(f"se esperaba una lista de productos y llegó {type(productos).__name__}")
+    producto = productos[0]
+    items = producto.get("items") or []
+    item = next((i for i in items if i.get("ean") == ean_producto), items[0] if items else {})
+    sellers = item.get("sellers") or [{}]
+    oferta = sellers[0].get("commertialOffer") or {}
+    nombre = producto.get("productName") or "N/A"
+    marca = producto.get("brand") or (nombre.split()[0] if nombre != "N/A" else "N/A")
+    # Los precios vienen como float (ej. 97360.0); se pasan a entero antes de normalizar.
+    p_online = str(int(oferta.get("Price") or 0))
+    p_normal = str(int(oferta.get("ListPrice") or oferta.get("Price") or 0))
     return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
 
 # --------------------------------------------------------------------
 # 4. MANEJO DE POP-UPS
 # --------------------------------------------------------------------
+# Solo estos sitios muestran pop-ups conocidos; en el resto no se busca nada.
+POPUP_SITES = {"cruzverde_co", "cafam_co"}
+
 def handle_popups(driver, pagina):
+    if pagina not in POPUP_SITES:
+        return
     print("  -> Buscando y cerrando pop-ups...")
+    # Espera corta: si el pop-up no aparece en 2s se sigue sin él.
+    wait = WebDriverWait(driver, 2)
     if pagina == "cruzverde_co":
         try:
-            wait = WebDriverWait(driver, 3)
             bogota_button = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Bogot')]")))
             bogota_button.click()
+            wait.until(EC.invisibility_of_element(bogota_button))
             print("    -> Pop-up de ubicación de Cruz Verde cerrado.")
-            time.sleep(1)
             return
         except: pass
     elif pagina == "cafam_co":
         try:
-            wait = WebDriverWait(driver, 10)
             close_button = wait.until(EC.presence_of_element_located((By.ID, "popupbasic-close")))
             driver.execute_script("arguments[0].click();", close_button)
+            wait.until(EC.invisibility_of_element(close_button))
             print("    -> ✓ Pop-up de publicidad cerrado usando JavaScript.")
-            time.sleep(1)
             return
         except:
             print("    -> No se encontró el popup inicial, continuando...")
-            
+
     try:
         ActionChains(driver).send_keys(Keys.ESCAPE).perform()
         print("    -> Intento de cierre con tecla ESC.")
-        time.sleep(1)
     except: pass
 
 # --------------------------------------------------------------------
 # 5. ESCRITURA CSV
 # --------------------------------------------------------------------
-def write_to_csv(filename, fila):
-    header = ['Farmacia', 'EAN', 'Product Name', 'Brand', 'Sale Price', 'Old Price', 'Stock', 'Fecha']
-    file_exists = exists(filename) and os.path.getsize(filename) > 0
-    with open(filename, 'a', newline='', encoding='utf-8') as f:
-        w = csv.writer(f)
-        if not file_exists: w.writerow(header)
-        w.writerow(fila)
+CSV_HEADER = ['Farmacia', 'EAN', 'Product Name', 'Brand', 'Sale Price', 'Old Price', 'Stock', 'Fecha']
+
+def write_csv(filename, filas):
+    """Sobrescribe el CSV con el encabezado y todas las filas en una sola apertura."""
+    with open(filename, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(filas)
 
 # --------------------------------------------------------------------
 # 6. SCRAPER GENERAL
 # --------------------------------------------------------------------
-def scrapper_general(pagina, ean_producto, keyword, driver):
+# Filas 'No Disponible' por un error (timeout, red, respuesta inválida) y no por un
+# resultado real de la búsqueda: se escriben en el CSV pero no se cachean entre corridas.
+NOMBRE_ERROR = "No disponible (Error de consulta)"
+
+def fila_error(pagina, ean_producto):
+    return [pagina, ean_producto, NOMBRE_ERROR, "N/A", 0, 0, "No Disponible", fecha_hoy_fmt()]
+
+def procesar_datos(pagina, ean_producto, keyword, datos):
+    """Valida y normaliza los datos extraídos y arma la fila del CSV."""
+    if datos:
+        nombre = datos.get("nombre", "N/A")
+        
+        # Verificación obligatoria con la función de validación mejorada.
+        keyword_normalizada = NORM_KEYWORDS.get(ean_producto) or normalizar_texto_para_comparacion(keyword)
+        if validar_nombre_producto(nombre, keyword_normalizada):
+            print(f"    -> ✓ Verificación de nombre exitosa. El nombre '{nombre}' contiene '{keyword}'.")
+            marca = datos.get("marca", "N/A")
+            
+            if pagina == "cafam_co":
+                p_online = normalizar_precio_cafam(datos.get("p_online", "0"))
+                p_normal = normalizar_precio_cafam(datos.get("p_normal", "0"))
+            else:
+                p_online = normalizar_precio(datos.get("p_online", "0"))
+                p_normal = normalizar_precio(datos.get("p_normal", "0"))
+
+            if p_online > 0 and p_normal == 0: p_normal = p_online
+            if p_online > p_normal and p_normal > 0: p_online, p_normal = p_normal, p_online
+            
+            stock = "Disponible" if p_online > 0 else "No Disponible"
+
+            print(f"    - Nombre: {nombre}")
+            print(f"    - Marca: {marca}")
+            print(f"    - Precio Online: {p_online}")
+            print(f"    - Precio Normal: {p_normal}")
+            print(f"    - Stock: {stock}")
+
+            if p_online > 0:
+                print(f"    -> ✓ Producto listo para guardar en CSV")
+                return [pagina, ean_producto, nombre, marca, p_online, p_normal, stock, fecha_hoy_fmt()]
+            else:
+                print(f"    -> ✗ Producto no guardado (precio es cero). Marcando como No disponible.")
+                return [pagina, ean_producto, nombre, "N/A", 0, 0, "No Disponible", fecha_hoy_fmt()]
+        
+        else:
+            # Si el nombre del producto no contiene la palabra clave, se descarta.
+            print(f"    -> ✗ VERIFICACIÓN FALLIDA: El nombre '{nombre}' no contiene la palabra clave '{keyword}'.")
+            print(f"    -> Se guardará como 'No disponible'.")
+            return [pagina, ean_producto, "No disponible (Nombre no coincide)", "N/A", 0, 0, "No Disponible", fecha_hoy_fmt()]
+        
+    else:
+        print(f"  -> PRODUCTO NO ENCONTRADO en {pagina}. Se guardará como 'No disponible'.")
+        return [pagina, ean_producto, "No disponible", "N/A", 0, 0, "No Disponible", fecha_hoy_fmt()]
+
+def iniciar_navegacion(driver, url):
+    """
+    Lanza la carga de url sin esperarla y devuelve el <html> del documento anterior,
+    para que esperar_navegacion espere a que sea reemplazado.
+    """
+    anterior = driver.find_element(By.TAG_NAME, "html")
+    if driver.current_url.split('#')[0] == url.split('#')[0]:
+        # Si solo cambia el fragmento (#...), como en cafam, no hay documento nuevo y las
+        # tarjetas de la búsqueda anterior siguen en el DOM. Pasar por about:blank fuerza
+        # una carga real, así que el <html> anterior siempre queda obsoleto.
+        driver.get("about:blank")
+    driver.get(url)
+    return anterior
+
+def esperar_navegacion(driver, anterior):
+    # Con page_load_strategy='none' hay que esperar a que el documento anterior sea
+    # reemplazado para no leer las tarjetas del EAN previo.
+    if anterior is not None:
+        WebDriverWait(driver, 15).until(EC.staleness_of(anterior))
+
+def navegar(driver, url):
+    esperar_navegacion(driver, iniciar_navegacion(driver, url))
+
+# Datos ya extraídos por (farmacia, EAN) en este proceso; evita repetir la navegación.
+EXTRACT_CACHE = cachetools.LRUCache(maxsize=512)
+
+def scrapper_general(pagina, ean_producto, keyword, driver, precargada=False, anterior=None):
+    """
+    Scrapea un EAN en una farmacia y devuelve la fila para el CSV.
+    Si precargada es True, la pestaña actual ya está cargando la URL (ver scrape_site)
+    y anterior es lo que devolvió iniciar_navegacion.
+    """
     config = SITE_CONFIG[pagina]
     url = config["search_url"].format(q=ean_producto)
     datos = {}
     
     try:
         print(f"\n--- SCRAPEANDO {pagina.upper()} PARA EAN {ean_producto} ({keyword}) ---")
-        print(f"-> Navegando a la URL...")
-        driver.get(url)
-
-        WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        print("  -> Página cargada. Esperando scripts...")
-        time.sleep(5)
+        if (pagina, ean_producto) in EXTRACT_CACHE:
+            print("-> Datos ya extraídos en esta sesión. Se omite la navegación.")
+            return procesar_datos(pagina, ean_producto, keyword, EXTRACT_CACHE[(pagina, ean_producto)])
+        if precargada:
+            print(f"-> URL precargada en otra pestaña. Esperando el documento...")
+            esperar_navegacion(driver, anterior)
+        else:
+            print(f"-> Navegando a la URL...")
+            navegar(driver, url)
         handle_popups(driver, pagina)
 
-        wait = WebDriverWait(driver, 20)
+        wait = WebDriverWait(driver, config.get("timeout", TIMEOUT_POR_DEFECTO))
 
-        if pagina in ["larebaja_co", "locatel_co", "olimpica_co"]:
-            print(f"  -> Estrategia: Página de producto directa. Esperando elemento clave...")
-            nombre_selector = config['selectors']['nombre']
-            wait.until(EC.presence_of_element_located((nombre_selector['by'], nombre_selector['value'])))
-            print("  -> ¡Elemento clave encontrado! Extrayendo datos...")
-            if pagina == "larebaja_co": datos = extraer_datos_larebaja(driver, config['selectors'])
-            elif pagina == "locatel_co": datos = extraer_datos_locatel(driver, config['selectors'])
-            elif pagina == "olimpica_co": datos = extraer_datos_olimpica(driver, config['selectors'])
-        
-        elif pagina == "pasteur_co":
-            print("  -> Estrategia: Búsqueda en lista de resultados con verificación de palabra clave.")
-            container_selector = config['container']
-            wait.until(EC.presence_of_all_elements_located((container_selector['by'], container_selector['value'])))
-            all_products = driver.find_elements(container_selector['by'], container_selector['value'])
-            print(f"  -> Encontrados {len(all_products)} productos. Verificando con palabra clave: '{keyword}'...")
-            
-            for item in all_products:
-                nombre_temp = _safe_find(item, config['selectors']['nombre']['by'], config['selectors']['nombre']['value'])
-                # La lógica de validación ahora usa la función mejorada.
-                if validar_nombre_producto(nombre_temp, keyword):
-                    print(f"  -> ✓ Producto '{nombre_temp}' COINCIDE. Extrayendo sus datos...")
-                    datos = extraer_datos_pasteur(item, config['selectors'])
-                    break
-                else:
-                    print(f"  -> ✗ Producto '{nombre_temp}' no coincide con la palabra clave. Saltando...")
-            
-            if not datos:
-                print(f"\n  -> INFO: No se encontró un producto que contenga '{keyword}' en los resultados de {pagina}.")
-
-        else: # Lógica general para las demás farmacias
-            print("  -> Estrategia: Búsqueda en lista de resultados. Buscando contenedor...")
-            item = None
-            if pagina == "farmatodo_co":
-                try:
-                    primary_selector = config["primary_container"]
-                    item = wait.until(EC.presence_of_element_located((primary_selector['by'], primary_selector['value'])))
-                except TimeoutException:
-                    fallback_selector = config["fallback_container"]
-                    print("    -> Selector primario falló. Intentando con selector de respaldo...")
-                    item = wait.until(EC.presence_of_element_located((fallback_selector['by'], fallback_selector['value'])))
-            elif pagina == "cafam_co":
-                print("  -> Esperando a que el NOMBRE del producto sea visible...")
-                nombre_selector = config['selectors']['nombre']
-                wait.until(EC.presence_of_element_located((nombre_selector['by'], nombre_selector['value'])))
-                container_selector = config["container"]
-                item = driver.find_element(container_selector['by'], container_selector['value'])
-            else: # Cruz Verde y Colsubsidio
-                container_selector = config["container"]
-                item = wait.until(EC.presence_of_element_located((container_selector['by'], container_selector['value'])))
-            
-            print("  -> ¡Contenedor de producto encontrado! Extrayendo datos...")
-            if pagina == "cruzverde_co": datos = extraer_datos_cruzverde(item)
-            elif pagina == "farmatodo_co": datos = extraer_datos_farmatodo(item)
-            elif pagina == "colsubsidio_co": datos = extraer_datos_colsubsidio(item)
-            elif pagina == "cafam_co": datos = extraer_datos_cafam(item)
-
-        # -- PROCESAMIENTO Y ESCRITURA DE DATOS --
-        if datos:
-            nombre = datos.get("nombre", "N/A")
-            
-            # Verificación obligatoria con la función de validación mejorada.
-            if validar_nombre_producto(nombre, keyword):
-                print(f"    -> ✓ Verificación de nombre exitosa. El nombre '{nombre}' contiene '{keyword}'.")
-                marca = datos.get("marca", "N/A")
-                
-                if pagina == "cafam_co":
-                    p_online = normalizar_precio_cafam(datos.get("p_online", "0"))
-                    p_normal = normalizar_precio_cafam(datos.get("p_normal", "0"))
-                else:
-                    p_online = normalizar_precio(datos.get("p_online", "0"))
-                    p_normal = normalizar_precio(datos.get("p_normal", "0"))
-
-                if p_online > 0 and p_normal == 0: p_normal = p_online
-                if p_online > p_normal and p_normal > 0: p_online, p_normal = p_normal, p_online
-                
-                stock = "Disponible" if p_online > 0 else "No Disponible"
-
-                print(f"    - Nombre: {nombre}")
-                print(f"    - Marca: {marca}")
-                print(f"    - Precio Online: {p_online}")
-                print(f"    - Precio Normal: {p_normal}")
-                print(f"    - Stock: {stock}")
-
-                if p_online > 0:
-                    write_to_csv(filename, [pagina, ean_producto, nombre, marca, p_online, p_normal, stock, fecha_hoy_fmt()])
-                    print(f"    -> ✓ Producto guardado en CSV")
-                else:
-                    print(f"    -> ✗ Producto no guardado (precio es cero). Marcando como No disponible.")
-                    write_to_csv(filename, [pagina, ean_producto, nombre, "N/A", 0, 0, "No Disponible", fecha_hoy_fmt()])
-            
-            else:
-                # Si el nombre del producto no contiene la palabra clave, se descarta.
-                print(f"    -> ✗ VERIFICACIÓN FALLIDA: El nombre '{nombre}' no contiene la palabra clave '{keyword}'.")
-                print(f"    -> Se guardará como 'No disponible'.")
-                write_to_csv(filename, [pagina, ean_producto, "No disponible (Nombre no coincide)", "N/A", 0, 0, "No Disponible", fecha_hoy_fmt()])
-            
-        else:
-            print(f"  -> PRODUCTO NO ENCONTRADO en {pagina}. Se guardará como 'No disponible'.")
-            write_to_csv(filename, [pagina, ean_producto, "No disponible", "N/A", 0, 0, "No Disponible", fecha_hoy_fmt()])
+        print("  -> Estrategia: Búsqueda en lista de resultados. Buscando contenedor...")
+        container_selector = config["container"]
+        item = wait.until(EC.presence_of_element_located((container_selector['by'], container_selector['value'])))
+
+        print("  -> ¡Contenedor de producto encontrado! Extrayendo datos...")
+        datos = driver.execute_script(JS_BY_SITE[pagina], item)
+
+        if datos: EXTRACT_CACHE[(pagina, ean_producto)] = datos
+        return procesar_datos(pagina, ean_producto, keyword, datos)
 
     except TimeoutException:
         print(f"\n  -> ERROR: Tiempo de espera agotado en {pagina}. El producto se considera 'No disponible'.")
-        driver.save_screenshot(f'{pagina}_{ean_producto}_error.png')
-        write_to_csv(filename, [pagina, ean_producto, "No disponible", "N/A", 0, 0, "No Disponible", fecha_hoy_fmt()])
-        return
+        if os.environ.get("SCRAPER_DEBUG"):
+            driver.save_screenshot(f'{pagina}_{ean_producto}_error.png')
+        return fila_error(pagina, ean_producto)
+
+# Sitios cuya búsqueda acepta palabra clave: una búsqueda trae varias tarjetas a la vez.
+KEYWORD_FRIENDLY = {"cafam_co", "colsubsidio_co"}
+
+# Para cada tarjeta, el primer EAN buscado que aparece en su HTML (enlaces, data-*), o null.
+_JS_EAN_POR_TARJETA = """
+const [cards, eans] = arguments;
+return cards.map(c => { const html = c.outerHTML; return eans.find(ean => html.includes(ean)) || null; });
+"""
+
+def precargar_por_keyword(pagina, keyword, eans, driver):
+    """
+    Hace una sola búsqueda por palabra clave y guarda en EXTRACT_CACHE los datos de
+    cada tarjeta que se pueda asociar a uno de los EANs. Los EANs que no aparezcan
+    se siguen buscando uno por uno en scrapper_general.
+    """
+    config = SITE_CONFIG[pagina]
+    url = config["search_url"].format(q=quote(keyword))
+    try:
+        print(f"\n--- BUSCANDO '{keyword}' EN {pagina.upper()} PARA {len(eans)} EANs ---")
+        navegar(driver, url)
+        handle_popups(driver, pagina)
+        container_selector = config["container"]
+        WebDriverWait(driver, config.get("timeout", TIMEOUT_POR_DEFECTO)).until(EC.presence_of_element_located((container_selector['by'], container_selector['value'])))
+        cards = driver.find_elements(container_selector['by'], container_selector['value'])
+        eans_por_card = driver.execute_script(_JS_EAN_POR_TARJETA, cards, eans)
+        for item, ean in zip(cards, eans_por_card):
+            if ean and (pagina, ean) not in EXTRACT_CACHE:
+                datos = driver.execute_script(JS_BY_SITE[pagina], item)
+                if datos: EXTRACT_CACHE[(pagina, ean)] = datos
+        encontrados = sum((pagina, ean) in EXTRACT_CACHE for ean in eans)
+        print(f"  -> {encontrados} de {len(eans)} EANs encontrados en los resultados de '{keyword}'.")
+    except TimeoutException:
+        print(f"  -> Sin resultados para '{keyword}' en {pagina}. Se buscará EAN por EAN.")
+    except WebDriverException as e:
+        # Ej. StaleElementReferenceException si los resultados se vuelven a pintar a mitad de la lectura.
+        print(f"  -> Falló la búsqueda de '{keyword}' en {pagina}: {e.__class__.__name__}. Se buscará EAN por EAN.")
 
 # --------------------------------------------------------------------
-# 7. CONFIGURAR DRIVER Y EJECUCIÓN
+# 7. CONSULTAS HTTP DIRECTAS (SIN NAVEGADOR)
 # --------------------------------------------------------------------
-if __name__ == "__main__":
+VTEX_SEARCH_URL = "https://{host}/api/catalog_system/pub/products/search?fq=alternateIds_Ean:{q}"
+VTEX_MAX_CONCURRENCIA = 16
+
+async def fetch_vtex(session, host, q, timeout=TIMEOUT_POR_DEFECTO):
+    async with session.get(VTEX_SEARCH_URL.format(host=host, q=q), timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+        resp.raise_for_status()
+        return orjson.loads(await resp.read())
+
+async def scrapper_vtex(session, semaforo, pagina, ean_producto, keyword):
+    """Equivalente de scrapper_general para tiendas VTEX, vía API de catálogo."""
+    async with semaforo:
+        try:
+            config = SITE_CONFIG[pagina]
+            productos = await fetch_vtex(session, config["vtex_host"], ean_producto, config.get("timeout", TIMEOUT_POR_DEFECTO))
+            datos = extraer_datos_vtex(productos, ean_producto)
+        # ValueError cubre JSON inválido (orjson.JSONDecodeError) y precios no numéricos;
+        # el resto, un JSON con otra forma (null, dict en vez de lista, etc.).
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, TypeError, AttributeError, KeyError, IndexError) as e:
+            print(f"\n  -> ERROR: Falló la consulta a {pagina} para EAN {ean_producto}: {e}. El producto se considera 'No disponible'.")
+            return fila_error(pagina, ean_producto)
+
+    print(f"\n--- CONSULTANDO API DE {pagina.upper()} PARA EAN {ean_producto} ({keyword}) ---")
+    return procesar_datos(pagina, ean_producto, keyword, datos)
+
+async def scrape_vtex_sites(productos_por_sitio):
+    semaforo = asyncio.Semaphore(VTEX_MAX_CONCURRENCIA)
+    async with aiohttp.ClientSession(headers={"User-Agent": USER_AGENT}) as session:
+        tareas = [scrapper_vtex(session, semaforo, farmacia, ean, keyword)
+                  for farmacia in VTEX_SITES for ean, keyword in productos_por_sitio[farmacia].items()]
+        return await asyncio.gather(*tareas)
+
+# Sitios cuyo chequeo ya falló en esta corrida: el aviso sale una sola vez por sitio.
+_CHECKS_FALLIDOS = set()
+
+def _avisar_check_fallido(site, motivo):
+    if site not in _CHECKS_FALLIDOS:
+        _CHECKS_FALLIDOS.add(site)
+        print(f"-> AVISO: el chequeo previo de {site} ({SITE_CONFIG[site]['check_url']}) falló: {motivo}. "
+              f"No se descarta ningún EAN de este sitio; todos se buscan con Selenium.")
+
+async def has_results(session, site, ean):
+    """
+    Consulta barata al buscador JSON del sitio ("check_url"). Devuelve True/False según
+    el "total" de la respuesta, o None (con aviso) si la respuesta es inesperada, en cuyo
+    caso el EAN se sigue buscando con Selenium.
+    """
+    config = SITE_CONFIG[site]
+    try:
+        timeout = aiohttp.ClientTimeout(total=config.get("timeout", TIMEOUT_POR_DEFECTO))
+        async with session.get(config["check_url"].format(q=ean), timeout=timeout) as resp:
+            if resp.status != 200:
+                _avisar_check_fallido(site, f"HTTP {resp.status}")
+                return None
+            total = orjson.loads(await resp.read()).get("total")
+    except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError, AttributeError) as e:
+        _avisar_check_fallido(site, f"{e.__class__.__name__} {e}")
+        return None
+    if not isinstance(total, int):
+        _avisar_check_fallido(site, f"la respuesta no trae un 'total' numérico ({total!r})")
+        return None
+    return total > 0
+
+async def _chequear_resultados(session, semaforo, site, ean):
+    async with semaforo:
+        return site, ean, await has_results(session, site, ean)
+
+async def descartar_sin_resultados(productos_por_sitio):
+    """Quita de productos_por_sitio los EANs sin resultados y devuelve sus filas 'No Disponible'."""
+    semaforo = asyncio.Semaphore(VTEX_MAX_CONCURRENCIA)
+    sitios = [f for f in SELENIUM_SITES if "check_url" in SITE_CONFIG[f]]
+    eans_por_sitio = {f: list(productos_por_sitio[f]) for f in sitios if productos_por_sitio[f]}
+    async with aiohttp.ClientSession(headers={"User-Agent": USER_AGENT}) as session:
+        # Primero un EAN por sitio: si el endpoint no responde como se espera, no se
+        # gastan consultas en el resto de sus EANs.
+        chequeos = await asyncio.gather(*[_chequear_resultados(session, semaforo, farmacia, eans[0])
+                                          for farmacia, eans in eans_por_sitio.items()])
+        resto = [(farmacia, ean) for farmacia, _, hay_resultados in chequeos if hay_resultados is not None
+                 for ean in eans_por_sitio[farmacia][1:]]
+        chequeos += await asyncio.gather(*[_chequear_resultados(session, semaforo, farmacia, ean)
+                                           for farmacia, ean in resto])
+    filas = []
+    for farmacia, ean, hay_resultados in chequeos:
+        if hay_resultados is False:
+            print(f"-> {farmacia}: la búsqueda de {ean} no trae resultados. Se marca 'No disponible' sin abrir Selenium.")
+            del productos_por_sitio[farmacia][ean]
+            filas.append([farmacia, ean, "No disponible", "N/A", 0, 0, "No Disponible", fecha_hoy_fmt()])
+    return filas
+
+# --------------------------------------------------------------------
+# 8. CONFIGURAR DRIVER Y POOL DE PROCESOS
+# --------------------------------------------------------------------
+# Recursos que Chrome no debe descargar (imágenes, fuentes, video, analítica y trackers).
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.woff*", "*.mp4",
+    "*analytics*", "*googletagmanager*",
+    "*doubleclick*", "*facebook.net*", "*hotjar*", "*segment.io*", "*cdn.segment.com*",
+]
+
+def crear_driver(debugger_address=None):
     opts = Options()
-    opts.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    prefs = {"profile.default_content_setting_values.notifications": 2, "profile.default_content_setting_values.geolocation": 2}
-    opts.add_experimental_option("prefs", prefs)
-    opts.add_argument("--window-size=1920,1080")
-    opts.add_argument("--start-maximized")
-    # opts.add_argument("--headless") # Descomentar para ejecución sin interfaz gráfica
-    opts.add_argument("--disable-gpu")
-    opts.add_argument("--no-sandbox")
-    opts.add_argument("--log-level=3")
-    opts.add_experimental_option("excludeSwitches", ["enable-logging", "enable-automation"])
-    opts.add_experimental_option('useAutomationExtension', False)
-    opts.page_load_strategy = 'eager'
+    if debugger_address:
+        # Se conecta a un Chrome ya abierto: caché, cookies y DNS siguen calientes entre corridas.
+        opts.add_experimental_option("debuggerAddress", debugger_address)
+        opts.page_load_strategy = 'none'
+    else:
+        opts.add_argument(f"user-agent={USER_AGENT}")
+        prefs = {"profile.default_content_setting_values.notifications": 2, "profile.default_content_setting_values.geolocation": 2}
+        # Solo se lee texto del DOM: no se descargan imágenes, hojas de estilo ni plugins.
+        prefs["profile.managed_default_content_settings.images"] = 2
+        prefs["profile.managed_default_content_settings.stylesheets"] = 2
+        prefs["profile.managed_default_content_settings.plugins"] = 2
+        opts.add_experimental_option("prefs", prefs)
+        opts.add_argument("--window-size=1920,1080")
+        opts.add_argument("--start-maximized")
+        opts.add_argument("--headless=new") # Comentar para ver el navegador mientras scrapea
+        opts.add_argument("--disable-gpu")
+        opts.add_argument("--no-sandbox")
+        opts.add_argument("--log-level=3")
+        opts.add_experimental_option("excludeSwitches", ["enable-logging", "enable-automation"])
+        opts.add_experimental_option('useAutomationExtension', False)
+        opts.page_load_strategy = 'none' # Solo se espera el selector de cada sitio
 
     driver = webdriver.Chrome(options=opts)
     driver.set_page_load_timeout(40)
+    bloquear_recursos(driver)
+    return driver
+
+def bloquear_recursos(driver):
+    # Los comandos CDP aplican a la pestaña actual: se repite en cada pestaña nueva.
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+
+# Cada proceso del pool tiene su propio Chrome (Selenium no es thread-safe).
+_driver = None
+# Dos pestañas por driver: mientras se extrae en una, la otra ya carga el siguiente EAN.
+_pestanas = []
+
+def _salir_por_sigterm(signum, frame):
+    # Pool.terminate() manda SIGTERM a los workers. Convertido en SystemExit, el worker
+    # sale por su camino normal y corren los Finalize, que cierran Chrome y chromedriver.
+    raise SystemExit(1)
+
+def _init_worker(cola_puertos=None):
+    global _driver
+    signal.signal(signal.SIGTERM, _salir_por_sigterm)
+    debugger_address = None
+    if cola_puertos is not None:
+        try:
+            debugger_address = f"127.0.0.1:{cola_puertos.get(timeout=5)}"
+        except queue.Empty:
+            print("  -> No quedan puertos de Chrome libres. Se abre un Chrome nuevo para este worker.")
+    try:
+        _driver = crear_driver(debugger_address)
+        principal = _driver.current_window_handle
+        _driver.switch_to.new_window('tab')
+        bloquear_recursos(_driver)
+        _pestanas[:] = [principal, _driver.current_window_handle]
+    except Exception as e:
+        # Si el initializer lanza, Pool reemplaza al worker sin fin y la corrida nunca
+        # termina: se deja el worker sin driver y scrape_site marca sus EANs con error.
+        print(f"\nERROR: No se pudo iniciar Chrome en este worker: {e}")
+        traceback.print_exc()
+        if _driver is not None:
+            try: _driver.quit()
+            except: pass
+        _driver = None
+        return
+    # Cierra el Chrome del worker cuando el pool termina con close() + join().
+    Finalize(None, _cerrar_driver, args=(debugger_address is not None,), exitpriority=10)
+
+def _cerrar_driver(adjunto):
+    if adjunto and len(_pestanas) > 1:
+        # quit() no cierra un Chrome que ChromeDriver no lanzó: sin esto, cada corrida
+        # dejaría una pestaña más abierta en el Chrome persistente.
+        try:
+            _driver.switch_to.window(_pestanas[1])
+            _driver.close()
+            _driver.switch_to.window(_pestanas[0])
+        except: pass
+    _driver.quit()
+
+def _precargar(farmacia, ean, pestana, precargas):
+    """Cambia a la pestaña y lanza la carga del EAN sin esperarla."""
+    try:
+        _driver.switch_to.window(pestana)
+        precargas[ean] = iniciar_navegacion(_driver, SITE_CONFIG[farmacia]["search_url"].format(q=ean))
+    except Exception as e:
+        print(f"  -> No se pudo precargar {farmacia} para EAN {ean}: {e}. Se navegará al procesarlo.")
+
+def scrape_site(farmacia, productos_dict):
+    """Recorre todos los EANs de una farmacia reutilizando el driver del worker."""
+    if _driver is None:
+        print(f"\n-> {farmacia}: este worker no tiene Chrome. Sus EANs se marcan como error de consulta.")
+        return [fila_error(farmacia, ean) for ean in productos_dict]
+    if farmacia in KEYWORD_FRIENDLY:
+        eans_por_keyword = defaultdict(list)
+        for ean, keyword in productos_dict.items():
+            eans_por_keyword[keyword].append(ean)
+        for keyword, eans in eans_por_keyword.items():
+            try:
+                precargar_por_keyword(farmacia, keyword, eans, _driver)
+            except Exception as e:
+                print(f"\nERROR INESPERADO en {farmacia} buscando '{keyword}': {e}. Se buscará EAN por EAN.")
+                traceback.print_exc()
+
+    # Los EANs que ya están en EXTRACT_CACHE no navegan; el resto alterna entre las dos
+    # pestañas y cada uno se precarga mientras se extrae el anterior.
+    por_navegar = [ean for ean in productos_dict if (farmacia, ean) not in EXTRACT_CACHE]
+    pestana_de = {ean: _pestanas[i % 2] for i, ean in enumerate(por_navegar)}
+    siguiente = dict(zip(por_navegar, por_navegar[1:]))
+    precargas = {}
+    if por_navegar:
+        _precargar(farmacia, por_navegar[0], pestana_de[por_navegar[0]], precargas)
+
+    filas = []
+    for ean, keyword in productos_dict.items():
+        try:
+            if ean in siguiente:
+                _precargar(farmacia, siguiente[ean], pestana_de[siguiente[ean]], precargas)
+            if ean in pestana_de:
+                _driver.switch_to.window(pestana_de[ean])
+            if ean in precargas:
+                fila = scrapper_general(farmacia, ean, keyword, _driver, precargada=True, anterior=precargas.pop(ean))
+            else:
+                fila = scrapper_general(farmacia, ean, keyword, _driver)
+            if fila: filas.append(fila)
+        except Exception as e:
+            print(f"\nERROR INESPERADO en {farmacia} para EAN {ean}: {e}")
+            traceback.print_exc()
+    return filas
+
+# --------------------------------------------------------------------
+# 9. CACHÉ DE PRODUCTOS NO DISPONIBLES ENTRE CORRIDAS
+# --------------------------------------------------------------------
+CACHE_NO_DISPONIBLES = "scraper_cache.db"
+CACHE_TTL_SEGUNDOS = 6 * 60 * 60
+
+def cargar_no_disponibles(farmacias, productos_dict):
+    """Devuelve {(farmacia, ean): fila} de los 'No Disponible' vistos hace menos de CACHE_TTL_SEGUNDOS."""
+    ahora = time.time()
+    vigentes = {}
+    with shelve.open(CACHE_NO_DISPONIBLES) as cache:
+        for farmacia in farmacias:
+            for ean in productos_dict:
+                entrada = cache.get(f"{farmacia}|{ean}")
+                if entrada and ahora - entrada[0] < CACHE_TTL_SEGUNDOS:
+                    vigentes[(farmacia, ean)] = entrada[1]
+    return vigentes
+
+def guardar_no_disponibles(filas):
+    """Registra los 'No Disponible' de esta corrida y olvida los que volvieron a estar disponibles."""
+    ahora = time.time()
+    with shelve.open(CACHE_NO_DISPONIBLES) as cache:
+        for fila in filas:
+            # Un error no dice nada del producto: se vuelve a buscar en la próxima corrida.
+            if fila[2] == NOMBRE_ERROR: continue
+            clave = f"{fila[0]}|{fila[1]}"
+            if fila[6] == "No Disponible": cache[clave] = (ahora, fila)
+            elif clave in cache: del cache[clave]
 
+# --------------------------------------------------------------------
+# 10. EJECUCIÓN
+# --------------------------------------------------------------------
+if __name__ == "__main__":
     filename = "Precios_Farmacias_Unificado_Final.csv"
-    if exists(filename): os.remove(filename) # Limpia el archivo al iniciar
 
     print("--- INICIANDO SCRAPER UNIFICADO ---")
+    # Lo que no estaba disponible en una corrida reciente se reutiliza sin volver a buscarlo.
+    filas_por_clave = cargar_no_disponibles(FARMACIAS_A_BUSCAR, PRODUCTOS_A_BUSCAR)
+    if filas_por_clave:
+        print(f"-> {len(filas_por_clave)} búsquedas 'No Disponible' recientes se toman de {CACHE_NO_DISPONIBLES}.")
+    productos_por_sitio = {
+        farmacia: {ean: kw for ean, kw in PRODUCTOS_A_BUSCAR.items() if (farmacia, ean) not in filas_por_clave}
+        for farmacia in FARMACIAS_A_BUSCAR
+    }
+    filas_nuevas = asyncio.run(descartar_sin_resultados(productos_por_sitio))
+    # Opcional: puertos de Chrome ya abiertos con --remote-debugging-port (uno por worker).
+    cola_puertos = None
+    if os.environ.get("SCRAPER_CHROME_PORTS"):
+        cola_puertos = multiprocessing.Queue()
+        for puerto in os.environ["SCRAPER_CHROME_PORTS"].split(","):
+            cola_puertos.put(puerto.strip())
+
+    pool = multiprocessing.Pool(processes=len(SELENIUM_SITES), initializer=_init_worker, initargs=(cola_puertos,))
     try:
-        for ean, keyword in PRODUCTOS_A_BUSCAR.items():
-            for farmacia in FARMACIAS_A_BUSCAR:
-                scrapper_general(farmacia, ean, keyword, driver)
-
+        # Las farmacias con Selenium corren en el pool mientras el padre consulta las APIs VTEX.
+        tareas = [(farmacia, productos_por_sitio[farmacia]) for farmacia in SELENIUM_SITES]
+        resultado_selenium = pool.starmap_async(scrape_site, tareas)
+        filas_vtex = asyncio.run(scrape_vtex_sites(productos_por_sitio))
+        # Las filas VTEX se guardan antes del get(): si el pool falla, no se pierden.
+        filas_nuevas.extend(filas_vtex)
+        for filas in resultado_selenium.get():
+            filas_nuevas.extend(filas)
+        pool.close()
     except Exception as e:
         print(f"\nERROR INESPERADO Y FATAL: {e}")
-        import traceback
         traceback.print_exc()
+        pool.terminate()
+    except BaseException:
+        # Ctrl-C (u otra salida): se detiene el pool y el finally guarda lo obtenido hasta
+        # ahora antes de que la interrupción siga su curso.
+        print("\n-> Corrida interrumpida. Cerrando los navegadores y guardando los resultados obtenidos...")
+        pool.terminate()
+        raise
     finally:
-        driver.quit()
+        pool.join()
+        for fila in filas_nuevas:
+            filas_por_clave[(fila[0], fila[1])] = fila
+        guardar_no_disponibles(filas_nuevas)
+        # Solo el proceso padre escribe el CSV, en el mismo orden EAN -> farmacia de siempre.
+        resultados = [filas_por_clave[(farmacia, ean)]
+                      for ean in PRODUCTOS_A_BUSCAR for farmacia in FARMACIAS_A_BUSCAR
+                      if (farmacia, ean) in filas_por_clave]
+        # El CSV anterior solo se reemplaza aquí, cuando ya están los resultados.
+        write_csv(filename, resultados)
         print("\n--- SCRAPER FINALIZADO ---")
 
-    if exists(filename) and os.path.getsize(filename) > 0:
-        df = pd.read_csv(filename)
+    if filas_por_clave:
         print("\nContenido del archivo CSV generado:")
-        print(df.to_string())
+        with open(filename, encoding='utf-8') as f:
+            print(f.read())
     else:
         print("\nNo se guardaron datos en el archivo CSV.")
\ No newline at end of file
@@ -5,17 +5,10 @@ Busca un EAN en 8 farmacias, manejando errores de carga de página y múltiples
 Adaptado 08-sep-2025
 """
 
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.common.keys import Keys
-
-import csv, time, re, os
+import aiohttp
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+import asyncio, csv, re, os, traceback
 from os.path import exists
 from datetime import datetime
 from pathlib import Path
@@ -26,22 +19,32 @@ from pathlib import Path
 EAN_A_BUSCAR = "7702418006430"
 # Se añade "pasteur_co" a la lista final de farmacias.
 FARMACIAS_A_BUSCAR = ["cruzverde_co", "farmatodo_co", "larebaja_co", "locatel_co", "colsubsidio_co", "cafam_co", "olimpica_co", "pasteur_co"]
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 # --------------------------------------------------------------------
 
 
 # --------------------------------------------------------------------
 # 1. UTILIDADES
 # --------------------------------------------------------------------
+class _TablaDigitos(dict):
+    """Tabla para str.translate que conserva 0-9 y borra cualquier otro carácter."""
+    def __missing__(self, codigo):
+        # Se completa sola con cada carácter nuevo, así que también cubre \xa0, '$', etc.
+        self[codigo] = valor = codigo if 48 <= codigo <= 57 else None
+        return valor
+
+_KEEP_DIGITS = _TablaDigitos()
+
 def normalizar_precio(raw_price: str) -> int:
     """Función de normalización general para la mayoría de farmacias."""
     if not raw_price:
         return 0
-    return int(re.sub(r'[^0-9]', '', raw_price) or 0)
+    return int(raw_price.translate(_KEEP_DIGITS) or 0)
 
 def normalizar_precio_cafam(raw_price: str) -> int:
     """Normaliza el precio de Cafam, ignorando los centavos después de la coma."""
     main_price_part = raw_price.split(',')[0]
-    return int(re.sub(r'[^0-9]', '', main_price_part) or 0)
+    return int(main_price_part.translate(_KEEP_DIGITS) or 0)
 
 def fecha_hoy_fmt() -> str:
     return datetime.now().strftime("%d/%m/%Y")
@@ -49,63 +52,81 @@ def fecha_hoy_fmt() -> str:
 # --------------------------------------------------------------------
 # 2. CONFIGURACIÓN DE SITIOS
 # --------------------------------------------------------------------
+# Los selectores son CSS (Playwright); un nombre de etiqueta solo también es CSS válido.
+# strategy indica cómo encontrar el producto en la página (ver STRATEGIES en la sección 6).
 SITE_CONFIG = {
     "cruzverde_co": {
         "search_url": "https://www.cruzverde.com.co/search?query={q}",
-        "container": {"by": By.TAG_NAME, "value": "ml-card-product"},
+        "strategy": "list",
+        "container": "ml-card-product",
     },
     "farmatodo_co": {
         "search_url": "https://www.farmatodo.com.co/buscar?product={q}",
-        "primary_container": {"by": By.CSS_SELECTOR, "value": "div[data-testid='product-card']"},
-        "fallback_container": {"by": By.TAG_NAME, "value": "app-new-product-card"},
+        "strategy": "list",
+        "container": "div[data-testid='product-card']",
+        "fallback_container": "app-new-product-card",
     },
     "larebaja_co": {
         "search_url": "https://www.larebajavirtual.com/{q}?_q={q}&map=ft",
+        "api_url": "https://www.larebajavirtual.com/api/catalog_system/pub/products/search?fq=alternateIds_Ean:{q}",
+        "strategy": "direct",
         "selectors": {
-            "nombre": {"by": By.CSS_SELECTOR, "value": "h3.vtex-product-summary-2-x-productNameContainer"},
-            "marca": {"by": By.CSS_SELECTOR, "value": "span.vtex-store-components-3-x-productBrandName"},
-            "p_online": {"by": By.CSS_SELECTOR, "value": "span.vtex-product-price-1-x-sellingPrice"},
-            "p_normal": {"by": By.CSS_SELECTOR, "value": "span.vtex-product-price-1-x-listPrice"}
+            "nombre": "h3.vtex-product-summary-2-x-productNameContainer",
+            "marca": "span.vtex-store-components-3-x-productBrandName",
+            "p_online": "span.vtex-product-price-1-x-sellingPrice",
+            "p_normal": "span.vtex-product-price-1-x-listPrice"
         }
     },
     "locatel_co": {
         "search_url": "https://www.locatelcolombia.com/{q}?_q={q}&map=ft",
+        "api_url": "https://www.locatelcolombia.com/api/catalog_system/pub/products/search?fq=alternateIds_Ean:{q}",
+        "strategy": "direct",
         "selectors": {
-            "nombre": {"by": By.CSS_SELECTOR, "value": "h2.vtex-product-summary-2-x-productNameContainer"},
-            "p_online": {"by": By.CSS_SELECTOR, "value": "span.vtex-store-components-3-x-sellingPrice"},
-            "p_normal": {"by": By.CSS_SELECTOR, "value": "div.vtex-store-components-3-x-listPrice"}
+            "nombre": "h2.vtex-product-summary-2-x-productNameContainer",
+            "p_online": "span.vtex-store-components-3-x-sellingPrice",
+            "p_normal": "div.vtex-store-components-3-x-listPrice"
         }
     },
     "colsubsidio_co": {
         "search_url": "https://www.drogueriascolsubsidio.com/{q}",
-        "container": {"by": By.CSS_SELECTOR, "value": "div.product-Vitrina-masVendidos"}
+        "strategy": "list",
+        "container": "div.product-Vitrina-masVendidos"
     },
     "cafam_co": {
         "search_url": "https://www.drogueriascafam.com.co/#2fce/fullscreen/m=and&q={q}",
-        "container": {"by": By.CSS_SELECTOR, "value": "div.dfd-card"},
+        "strategy": "list",
+        # La tarjeta aparece antes que su contenido: se espera al nombre.
+        "wait_for": "div.dfd-card-title",
+        "container": "div.dfd-card",
         "selectors": {
-            "nombre": {"by": By.CSS_SELECTOR, "value": "div.dfd-card-title"},
-            "p_online": {"by": By.CSS_SELECTOR, "value": "span.dfd-card-special-price"},
-            "p_sale": {"by": By.CSS_SELECTOR, "value": "span.dfd-card-price--sale"},
-            "p_normal": {"by": By.CSS_SELECTOR, "value": "span.dfd-card-price"}
+            "nombre": "div.dfd-card-title",
+            "p_online": "span.dfd-card-special-price",
+            "p_sale": "span.dfd-card-price--sale",
+            "p_normal": "span.dfd-card-price"
         }
     },
     "olimpica_co": {
         "search_url": "https://www.olimpica.com/{q}?_q={q}&map=ft",
+        "api_url": "https://www.olimpica.com/api/catalog_system/pub/products/search?fq=alternateIds_Ean:{q}",
+        "strategy": "direct",
         "selectors": {
-            "nombre": {"by": By.CSS_SELECTOR, "value": "h3.vtex-product-summary-2-x-productNameContainer"},
-            "marca": {"by": By.CSS_SELECTOR, "value": "span.vtex-product-summary-2-x-productBrandName"},
-            "p_online": {"by": By.CSS_SELECTOR, "value": "div.olimpica-dinamic-flags-0-x-listPrices"},
-            "p_normal": {"by": By.CSS_SELECTOR, "value": "span.vtex-product-price-1-x-sellingPrice--summary"}
+            "nombre": "h3.vtex-product-summary-2-x-productNameContainer",
+            "marca": "span.vtex-product-summary-2-x-productBrandName",
+            "p_online": "div.olimpica-dinamic-flags-0-x-listPrices",
+            "p_normal": "span.vtex-product-price-1-x-sellingPrice--summary"
         }
     },
     "pasteur_co": {
         "search_url": "https://www.farmaciaspasteur.com.co/{q}?_q={q}&map=ft",
-        "container": {"by": By.CSS_SELECTOR, "value": "section.vtex-product-summary-2-x-container"},
+        "api_url": "https://www.farmaciaspasteur.com.co/api/catalog_system/pub/products/search?fq=alternateIds_Ean:{q}",
+        # La búsqueda trae varios productos; se toma el primero cuyo nombre cumpla match_predicate.
+        "strategy": "match_list",
+        "match_predicate": lambda nombre: nombre.lower().startswith("anemidox"),
+        "container": "section.vtex-product-summary-2-x-container",
         "selectors": {
-            "nombre": {"by": By.CSS_SELECTOR, "value": "h4.vtex-product-summary-2-x-productNameContainer"},
-            "p_online": {"by": By.CSS_SELECTOR, "value": "span.vtex-product-price-1-x-sellingPriceValue"},
-            "p_normal": {"by": By.CSS_SELECTOR, "value": "span.vtex-product-price-1-x-listPriceValue"}
+            "nombre": "h4.vtex-product-summary-2-x-productNameContainer",
+            "p_online": "span.vtex-product-price-1-x-sellingPriceValue",
+            "p_normal": "span.vtex-product-price-1-x-listPriceValue"
         }
     }
 }
@@ -113,290 +134,380 @@ SITE_CONFIG = {
 # --------------------------------------------------------------------
 # 3. FUNCIONES DE EXTRACCIÓN ESPECIALIZADAS
 # --------------------------------------------------------------------
-def _safe_find(element, by, value):
-    try: 
-        return element.find_element(by, value).text.strip()
-    except NoSuchElementException: 
-        return None
-
-def extraer_datos_olimpica(driver, selectors):
-    nombre = _safe_find(driver, selectors['nombre']['by'], selectors['nombre']['value']) or "N/A"
-    marca = _safe_find(driver, selectors['marca']['by'], selectors['marca']['value']) or "N/A"
-    p_online = _safe_find(driver, selectors['p_online']['by'], selectors['p_online']['value'])
-    p_normal = _safe_find(driver, selectors['p_normal']['by'], selectors['p_normal']['value'])
-    if not p_online: p_online = p_normal
-    if not p_normal: p_normal = p_online
-    p_online = p_online or "0"
-    p_normal = p_normal or "0"
-    return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
-
-def extraer_datos_pasteur(item, selectors):
-    nombre = _safe_find(item, selectors['nombre']['by'], selectors['nombre']['value']) or "N/A"
-    marca = nombre.split()[0] if nombre != "N/A" else "N/A"
-    p_online = _safe_find(item, selectors['p_online']['by'], selectors['p_online']['value'])
-    p_normal = _safe_find(item, selectors['p_normal']['by'], selectors['p_normal']['value'])
-    if not p_normal: p_normal = p_online
-    p_online = p_online or "0"
-    p_normal = p_normal or "0"
-    return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
-
-def extraer_datos_cruzverde(item):
-    nombre_bruto, fabricante, marca, p_online, p_normal = "N/A", "N/A", "N/A", "0", "0"
-    try:
-        elements = item.find_elements(By.TAG_NAME, "div") + item.find_elements(By.TAG_NAME, "p")
-        candidatos_nombre = [elem.text.strip() for elem in elements if elem.text.strip() and len(elem.text.strip()) > 10 and "$" not in elem.text]
-        if candidatos_nombre: nombre_bruto = max(candidatos_nombre, key=len)
-    except: pass
-    try:
-        fabricante = item.find_element(By.CSS_SELECTOR, "div.italic").text.strip()
-    except: pass
-    
-    nombre_limpio = nombre_bruto.replace(fabricante, "").replace('\n', ' ').strip()
-    if nombre_limpio != "N/A":
-        marca = nombre_limpio.split()[0]
-
-    try:
-        elements = item.find_elements(By.TAG_NAME, "span") + item.find_elements(By.TAG_NAME, "p")
-        for elem in elements:
-            text = elem.text.strip()
-            if "$" in text and len(re.sub(r'[^0-9]', '', text)) >= 4:
-                if "Normal" in text: p_normal = text
-                elif p_online == "0": p_online = text
-    except: pass
-    return {"nombre": nombre_limpio, "marca": marca, "p_online": p_online, "p_normal": p_normal}
-
-def extraer_datos_farmatodo(item):
-    marca = _safe_find(item, By.CSS_SELECTOR, "p.text-brand") or "N/A"
-    nombre = _safe_find(item, By.CSS_SELECTOR, "p.text-title") or "N/A"
-    p_online = _safe_find(item, By.CSS_SELECTOR, "span.price__text-price") or "0"
-    p_normal = _safe_find(item, By.CSS_SELECTOR, "span.price__text-offer-price") or "0"
-    return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
-
-def extraer_datos_larebaja(driver, selectors):
-    nombre = _safe_find(driver, selectors['nombre']['by'], selectors['nombre']['value']) or "N/A"
-    marca = _safe_find(driver, selectors['marca']['by'], selectors['marca']['value']) or "N/A"
-    p_online = _safe_find(driver, selectors['p_online']['by'], selectors['p_online']['value']) or "0"
-    p_normal = _safe_find(driver, selectors['p_normal']['by'], selectors['p_normal']['value']) or p_online
-    return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
+_JS_BATCH = """
+([contenedor, campos]) => Array.from(document.querySelectorAll(contenedor)).map(c => {
+    const fila = {};
+    for (const [campo, s] of Object.entries(campos)) {
+        const e = c.querySelector(s);
+        fila[campo] = e ? e.textContent.trim() : null;
+    }
+    return fila;
+})
+"""
 
-def extraer_datos_locatel(driver, selectors):
-    nombre = _safe_find(driver, selectors['nombre']['by'], selectors['nombre']['value']) or "N/A"
-    marca = nombre.split()[0] if nombre != "N/A" else "N/A"
-    p_online = _safe_find(driver, selectors['p_online']['by'], selectors['p_online']['value']) or "0"
-    p_normal = _safe_find(driver, selectors['p_normal']['by'], selectors['p_normal']['value']) or p_online
-    return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
+async def _batch_extract(page, container_sel, field_sels):
+    """Lee los campos de todas las tarjetas de container_sel en un solo evaluate: [{campo: texto o None}]."""
+    return await page.evaluate(_JS_BATCH, [container_sel, field_sels])
+
+# Cada extractor es una función JS que corre dentro del navegador sobre la raíz r
+# (la tarjeta, o <body> en las páginas de producto directo) con los selectores del
+# sitio en sel, y devuelve {nombre, marca, p_online, p_normal} en un solo evaluate.
+# t() lee textContent y colapsa espacios, para no llevar saltos e indentación al CSV.
+_JS_PRELUDIO = """
+const t = s => { const e = r.querySelector(s); return e ? e.textContent.replace(/\\s+/g, ' ').trim() : ''; };
+const primeraPalabra = n => n !== 'N/A' ? n.split(/\\s+/)[0] : 'N/A';
+"""
 
-def extraer_datos_colsubsidio(item):
-    nombre = _safe_find(item, By.CSS_SELECTOR, "p.dataproducto-nameProduct") or "N/A"
-    marca = nombre.split()[0] if nombre != "N/A" else "N/A"
-    p_online = _safe_find(item, By.CSS_SELECTOR, "p.dataproducto-bestPrice") or "0"
-    p_normal_raw = _safe_find(item, By.CSS_SELECTOR, "div.precioTachadoVitrina")
-    p_normal = p_normal_raw if p_normal_raw else p_online
-    return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
+def _js(cuerpo):
+    return "(r, sel) => {" + _JS_PRELUDIO + cuerpo + "}"
+
+JS_BY_SITE = {
+    "olimpica_co": _js("""
+let p_online = t(sel.p_online), p_normal = t(sel.p_normal);
+if (!p_online) p_online = p_normal;
+if (!p_normal) p_normal = p_online;
+return {nombre: t(sel.nombre) || 'N/A', marca: t(sel.marca) || 'N/A', p_online: p_online || '0', p_normal: p_normal || '0'};
+"""),
+    "pasteur_co": _js("""
+const nombre = t(sel.nombre) || 'N/A';
+const p_online = t(sel.p_online);
+const p_normal = t(sel.p_normal) || p_online;
+return {nombre: nombre, marca: primeraPalabra(nombre), p_online: p_online || '0', p_normal: p_normal || '0'};
+"""),
+    "cruzverde_co": _js("""
+let nombre = 'N/A';
+for (const e of [...r.querySelectorAll('div'), ...r.querySelectorAll('p')]) {
+    const s = e.innerText.trim();
+    if (s.length > 10 && !s.includes('$') && (nombre === 'N/A' || s.length > nombre.length)) nombre = s;
+}
+// innerText, igual que los candidatos a nombre: si no, split() puede no encontrarlo.
+const fab = r.querySelector('div.italic');
+const fabricante = fab ? fab.innerText.trim() : 'N/A';
+nombre = nombre.split(fabricante).join('').split('\\n').join(' ').trim();
+let p_online = '0', p_normal = '0';
+for (const e of [...r.querySelectorAll('span'), ...r.querySelectorAll('p')]) {
+    const s = e.innerText.trim();
+    if (s.includes('$') && s.replace(/[^0-9]/g, '').length >= 4) {
+        if (s.includes('Normal')) p_normal = s;
+        else if (p_online === '0') p_online = s;
+    }
+}
+return {nombre: nombre, marca: primeraPalabra(nombre), p_online: p_online, p_normal: p_normal};
+"""),
+    "farmatodo_co": _js("""
+return {nombre: t('p.text-title') || 'N/A', marca: t('p.text-brand') || 'N/A',
+        p_online: t('span.price__text-price') || '0', p_normal: t('span.price__text-offer-price') || '0'};
+"""),
+    "larebaja_co": _js("""
+const p_online = t(sel.p_online) || '0';
+return {nombre: t(sel.nombre) || 'N/A', marca: t(sel.marca) || 'N/A', p_online: p_online, p_normal: t(sel.p_normal) || p_online};
+"""),
+    "locatel_co": _js("""
+const nombre = t(sel.nombre) || 'N/A';
+const p_online = t(sel.p_online) || '0';
+return {nombre: nombre, marca: primeraPalabra(nombre), p_online: p_online, p_normal: t(sel.p_normal) || p_online};
+"""),
+    "colsubsidio_co": _js("""
+const nombre = t('p.dataproducto-nameProduct') || 'N/A';
+const p_online = t('p.dataproducto-bestPrice') || '0';
+return {nombre: nombre, marca: primeraPalabra(nombre), p_online: p_online, p_normal: t('div.precioTachadoVitrina') || p_online};
+"""),
+    "cafam_co": _js("""
+const nombre = t(sel.nombre) || 'N/A';
+const p_normal_raw = t(sel.p_normal);
+const p_online = t(sel.p_online) || t(sel.p_sale) || p_normal_raw || '0';
+return {nombre: nombre, marca: primeraPalabra(nombre), p_online: p_online, p_normal: p_normal_raw || p_online};
+"""),
+}
 
-def extraer_datos_cafam(item):
-    selectors = SITE_CONFIG["cafam_co"]["selectors"]
-    nombre = _safe_find(item, selectors['nombre']['by'], selectors['nombre']['value']) or "N/A"
-    marca = nombre.split()[0] if nombre != "N/A" else "N/A"
-    p_online_raw = (_safe_find(item, selectors['p_online']['by'], selectors['p_online']['value']) or
-                    _safe_find(item, selectors['p_sale']['by'], selectors['p_sale']['value']))
-    p_normal_raw = _safe_find(item, selectors['p_normal']['by'], selectors['p_normal']['value'])
-    p_online = p_online_raw if p_online_raw else p_normal_raw or "0"
-    p_normal = p_normal_raw if p_normal_raw else p_online
+async def extraer_datos(raiz, pagina):
+    """Corre el extractor JS de la farmacia sobre raiz (un locator) con los selectores de SITE_CONFIG."""
+    return await raiz.evaluate(JS_BY_SITE[pagina], SITE_CONFIG[pagina].get("selectors", {}))
+
+def extraer_datos_vtex(productos, ean_producto):
+    """Toma los datos del JSON de la API de catálogo VTEX (lista de productos)."""
+    if not productos:
+        return {}
+    if not isinstance(productos, list):
+        raise ValueError(f"se esperaba una lista de productos y llegó {type(productos).__name__}")
+    producto = productos[0]
+    items = producto.get("items") or []
+    item = next((i for i in items if i.get("ean") == ean_producto), items[0] if items else {})
+    sellers = item.get("sellers") or [{}]
+    oferta = sellers[0].get("commertialOffer") or {}
+    nombre = producto.get("productName") or "N/A"
+    marca = producto.get("brand") or (nombre.split()[0] if nombre != "N/A" else "N/A")
+    # Los precios vienen como float (ej. 97360.0); se pasan a entero antes de normalizar.
+    p_online = str(int(oferta.get("Price") or 0))
+    p_normal = str(int(oferta.get("ListPrice") or oferta.get("Price") or 0))
     return {"nombre": nombre, "marca": marca, "p_online": p_online, "p_normal": p_normal}
 
 # --------------------------------------------------------------------
 # 4. MANEJO DE POP-UPS
 # --------------------------------------------------------------------
-def handle_popups(driver, pagina):
+# Solo estos sitios muestran pop-ups conocidos; en el resto no se busca nada.
+POPUP_SITES = {"cruzverde_co", "cafam_co"}
+BOGOTA_BUTTON = "button:has-text('Bogot')"
+POPUP_CAFAM_CLOSE = "#popupbasic-close"
+
+async def handle_popups(page, pagina):
+    if pagina not in POPUP_SITES:
+        return
     print("  -> Buscando y cerrando pop-ups...")
     if pagina == "cruzverde_co":
         try:
-            wait = WebDriverWait(driver, 3)
-            bogota_button = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Bogot')]")))
-            bogota_button.click()
+            bogota_button = page.locator(BOGOTA_BUTTON).first
+            await bogota_button.click(timeout=3000)
+            await bogota_button.wait_for(state="hidden", timeout=2000)
             print("    -> Pop-up de ubicación de Cruz Verde cerrado.")
-            time.sleep(1)
             return
         except: pass
     elif pagina == "cafam_co":
         try:
-            wait = WebDriverWait(driver, 10)
-            close_button = wait.until(EC.presence_of_element_located((By.ID, "popupbasic-close")))
-            driver.execute_script("arguments[0].click();", close_button)
+            close_button = page.locator(POPUP_CAFAM_CLOSE)
+            # Espera corta, como en price_scrapper4.py: si no aparece en 2s se sigue sin él.
+            await close_button.wait_for(state="attached", timeout=2000)
+            await close_button.evaluate("el => el.click()")
+            await close_button.wait_for(state="hidden", timeout=2000)
             print("    -> ✓ Pop-up de publicidad cerrado usando JavaScript.")
-            time.sleep(1)
             return
         except:
             print("    -> No se encontró el popup inicial, continuando...")
-            
+
     try:
-        ActionChains(driver).send_keys(Keys.ESCAPE).perform()
+        await page.keyboard.press("Escape")
         print("    -> Intento de cierre con tecla ESC.")
-        time.sleep(1)
     except: pass
 
 # --------------------------------------------------------------------
 # 5. ESCRITURA CSV
 # --------------------------------------------------------------------
-def write_to_csv(filename, fila):
-    header = ['Farmacia', 'EAN', 'Product Name', 'Brand', 'Sale Price', 'Old Price', 'Stock', 'Fecha']
-    file_exists = exists(filename) and os.path.getsize(filename) > 0
-    with open(filename, 'a', newline='', encoding='utf-8') as f:
+CSV_HEADER = ['Farmacia', 'EAN', 'Product Name', 'Brand', 'Sale Price', 'Old Price', 'Stock', 'Fecha']
+
+def write_csv(filename, filas):
+    """Escribe el encabezado y todas las filas en una sola apertura del archivo."""
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
         w = csv.writer(f)
-        if not file_exists: w.writerow(header)
-        w.writerow(fila)
+        w.writerow(CSV_HEADER)
+        w.writerows(filas)
 
 # --------------------------------------------------------------------
 # 6. SCRAPER GENERAL
 # --------------------------------------------------------------------
-def scrapper_general(pagina, ean_producto, driver):
+async def wait_ready(page, timeout=15000):
+    """Espera a que document.readyState sea 'complete' (en vez de dormir un tiempo fijo)."""
+    try:
+        await page.wait_for_function("document.readyState === 'complete'", timeout=timeout)
+    except PlaywrightTimeoutError:
+        # Algún recurso lento no deja terminar la carga; la espera del selector decide.
+        print("  -> La página no terminó de cargar. Se continúa con la espera del selector...")
+
+def procesar_datos(pagina, ean_producto, datos):
+    """Normaliza los datos extraídos y devuelve la fila para el CSV (o None)."""
+    nombre = datos.get("nombre", "N/A")
+    marca = datos.get("marca", "N/A")
+
+    if pagina == "cafam_co":
+        p_online = normalizar_precio_cafam(datos.get("p_online", "0"))
+        p_normal = normalizar_precio_cafam(datos.get("p_normal", "0"))
+    else:
+        p_online = normalizar_precio(datos.get("p_online", "0"))
+        p_normal = normalizar_precio(datos.get("p_normal", "0"))
+
+    if p_online > 0 and p_normal == 0: p_normal = p_online
+    if p_online > p_normal and p_normal > 0: p_online, p_normal = p_normal, p_online
+
+    stock  = "Disponible" if p_online > 0 else "No Disponible"
+
+    print(f"    - Nombre: {nombre}")
+    print(f"    - Marca: {marca}")
+    print(f"    - Precio Online: {p_online}")
+    print(f"    - Precio Normal: {p_normal}")
+    print(f"    - Stock: {stock}")
+
+    if nombre and nombre != "N/A" and p_online > 0:
+        print(f"    -> ✓ Producto listo para guardar en CSV")
+        return [pagina, ean_producto, nombre, marca, p_online, p_normal, stock, fecha_hoy_fmt()]
+    else:
+        print(f"    -> ✗ Producto no guardado (nombre no encontrado o precio es cero)")
+
+# Cada estrategia espera lo que necesita y devuelve el locator sobre el que corre el
+# extractor de la farmacia (la tarjeta, o <body> en páginas de producto), o None.
+async def _estrategia_directa(page, config, timeout):
+    print(f"  -> Estrategia: Página de producto directa. Esperando elemento clave...")
+    await page.wait_for_selector(config['selectors']['nombre'], state="attached", timeout=timeout)
+    print("  -> ¡Elemento clave encontrado! Extrayendo datos...")
+    return page.locator("body")
+
+async def _estrategia_lista(page, config, timeout):
+    print("  -> Estrategia: Búsqueda en lista de resultados. Buscando contenedor...")
+    container_selector = config["container"]
+    if "wait_for" in config:
+        print("  -> Esperando a que el NOMBRE del producto sea visible...")
+        await page.wait_for_selector(config["wait_for"], state="attached", timeout=timeout)
+    else:
+        try:
+            await page.wait_for_selector(container_selector, state="attached", timeout=timeout)
+        except PlaywrightTimeoutError:
+            if "fallback_container" not in config: raise
+            container_selector = config["fallback_container"]
+            print("    -> Selector primario falló. Intentando con selector de respaldo...")
+            await page.wait_for_selector(container_selector, state="attached", timeout=timeout)
+    print("  -> ¡Contenedor de producto encontrado! Extrayendo datos...")
+    return page.locator(container_selector).first
+
+async def _estrategia_match_list(page, config, timeout):
+    print("  -> Estrategia: Búsqueda en lista de resultados.")
+    await page.wait_for_selector(config['container'], state="attached", timeout=timeout)
+    all_products = await _batch_extract(page, config['container'], {"nombre": config['selectors']['nombre']})
+    print(f"  -> Encontrados {len(all_products)} productos. Verificando...")
+
+    for i, producto in enumerate(all_products):
+        nombre_temp = producto["nombre"]
+        if nombre_temp and config["match_predicate"](nombre_temp):
+            print(f"  -> ✓ Producto '{nombre_temp}' encontrado. Extrayendo sus datos...")
+            return page.locator(config['container']).nth(i)
+        else:
+            print(f"  -> ✗ Producto '{nombre_temp}' no coincide. Saltando...")
+    return None
+
+STRATEGIES = {
+    "direct": _estrategia_directa,
+    "list": _estrategia_lista,
+    "match_list": _estrategia_match_list,
+}
+
+async def scrape(page, pagina, ean_producto):
+    """Scrapea el EAN en una farmacia con el navegador y devuelve la fila para el CSV (o None)."""
     config = SITE_CONFIG[pagina]
     url = config["search_url"].format(q=ean_producto)
-    
+
     try:
         print(f"\n--- SCRAPEANDO {pagina.upper()} ---")
         print(f"-> Navegando a la URL...")
-        driver.get(url)
-
-        WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        print("  -> Página cargada. Esperando scripts...")
-        time.sleep(5)
-        handle_popups(driver, pagina)
-
-        wait = WebDriverWait(driver, 20)
-        datos = {}
-
-        if pagina in ["larebaja_co", "locatel_co", "olimpica_co"]:
-            print(f"  -> Estrategia: Página de producto directa. Esperando elemento clave...")
-            nombre_selector = config['selectors']['nombre']
-            wait.until(EC.presence_of_element_located((nombre_selector['by'], nombre_selector['value'])))
-            print("  -> ¡Elemento clave encontrado! Extrayendo datos...")
-            if pagina == "larebaja_co": datos = extraer_datos_larebaja(driver, config['selectors'])
-            elif pagina == "locatel_co": datos = extraer_datos_locatel(driver, config['selectors'])
-            elif pagina == "olimpica_co": datos = extraer_datos_olimpica(driver, config['selectors'])
-        
-        # Lógica de búsqueda en lista para Pasteur
-        elif pagina == "pasteur_co":
-            print("  -> Estrategia: Búsqueda en lista de resultados.")
-            container_selector = config['container']
-            wait.until(EC.presence_of_all_elements_located((container_selector['by'], container_selector['value'])))
-            all_products = driver.find_elements(container_selector['by'], container_selector['value'])
-            print(f"  -> Encontrados {len(all_products)} productos. Verificando...")
-            
-            for item in all_products:
-                nombre_temp = _safe_find(item, config['selectors']['nombre']['by'], config['selectors']['nombre']['value'])
-                if nombre_temp and nombre_temp.lower().startswith("anemidox"):
-                    print(f"  -> ✓ Producto '{nombre_temp}' encontrado. Extrayendo sus datos...")
-                    datos = extraer_datos_pasteur(item, config['selectors'])
-                    break
-                else:
-                    print(f"  -> ✗ Producto '{nombre_temp}' no coincide. Saltando...")
-            
-            if not datos:
-                print(f"\n  -> ERROR: No se encontró el producto 'Anemidox' en los resultados de {pagina}.")
-                driver.save_screenshot(f'{pagina}_error_no_encontrado.png')
-                return
-
-        # Lógica general para las demás farmacias (lista de resultados)
-        else:
-            print("  -> Estrategia: Búsqueda en lista de resultados. Buscando contenedor...")
-            item = None
-            if pagina == "farmatodo_co":
-                try:
-                    primary_selector = config["primary_container"]
-                    item = wait.until(EC.presence_of_element_located((primary_selector['by'], primary_selector['value'])))
-                except TimeoutException:
-                    fallback_selector = config["fallback_container"]
-                    print("    -> Selector primario falló. Intentando con selector de respaldo...")
-                    item = wait.until(EC.presence_of_element_located((fallback_selector['by'], fallback_selector['value'])))
-            elif pagina == "cafam_co":
-                print("  -> Esperando a que el NOMBRE del producto sea visible...")
-                nombre_selector = config['selectors']['nombre']
-                wait.until(EC.presence_of_element_located((nombre_selector['by'], nombre_selector['value'])))
-                container_selector = config["container"]
-                item = driver.find_element(container_selector['by'], container_selector['value'])
-            else: # Cruz Verde y Colsubsidio
-                container_selector = config["container"]
-                item = wait.until(EC.presence_of_element_located((container_selector['by'], container_selector['value'])))
-            
-            print("  -> ¡Contenedor de producto encontrado! Extrayendo datos...")
-            if pagina == "cruzverde_co": datos = extraer_datos_cruzverde(item)
-            elif pagina == "farmatodo_co": datos = extraer_datos_farmatodo(item)
-            elif pagina == "colsubsidio_co": datos = extraer_datos_colsubsidio(item)
-            elif pagina == "cafam_co": datos = extraer_datos_cafam(item)
-
-        nombre = datos.get("nombre", "N/A")
-        marca = datos.get("marca", "N/A")
-        
-        if pagina == "cafam_co":
-            p_online = normalizar_precio_cafam(datos.get("p_online", "0"))
-            p_normal = normalizar_precio_cafam(datos.get("p_normal", "0"))
-        else:
-            p_online = normalizar_precio(datos.get("p_online", "0"))
-            p_normal = normalizar_precio(datos.get("p_normal", "0"))
-
-        if p_online > 0 and p_normal == 0: p_normal = p_online
-        if p_online > p_normal and p_normal > 0: p_online, p_normal = p_normal, p_online
-        
-        stock  = "Disponible" if p_online > 0 else "No Disponible"
-
-        print(f"    - Nombre: {nombre}")
-        print(f"    - Marca: {marca}")
-        print(f"    - Precio Online: {p_online}")
-        print(f"    - Precio Normal: {p_normal}")
-        print(f"    - Stock: {stock}")
-
-        if nombre and nombre != "N/A" and p_online > 0:
-            write_to_csv(filename, [pagina, ean_producto, nombre, marca, p_online, p_normal, stock, fecha_hoy_fmt()])
-            print(f"    -> ✓ Producto guardado en CSV")
-        else:
-            print(f"    -> ✗ Producto no guardado (nombre no encontrado o precio es cero)")
+        await page.goto(url, wait_until="domcontentloaded")
+
+        await wait_ready(page)
+        print("  -> Página cargada.")
+        await handle_popups(page, pagina)
+
+        raiz = await STRATEGIES[config["strategy"]](page, config, timeout=20000)
+        if raiz is None:
+            print(f"\n  -> ERROR: Ningún producto de los resultados de {pagina} coincide con el buscado.")
+            await page.screenshot(path=f'{pagina}_error_no_encontrado.png')
+            return
 
-    except TimeoutException:
+        datos = await extraer_datos(raiz, pagina)
+        return procesar_datos(pagina, ean_producto, datos)
+
+    except PlaywrightTimeoutError:
         print(f"\n  -> ERROR: Tiempo de espera agotado en {pagina}. Puede ser por carga lenta o porque no se encontró el producto.")
-        driver.save_screenshot(f'{pagina}_error.png')
+        await page.screenshot(path=f'{pagina}_error.png')
         return
 
 # --------------------------------------------------------------------
-# 7. CONFIGURAR DRIVER Y EJECUCIÓN
+# 7. CONSULTAS HTTP DIRECTAS (SIN NAVEGADOR)
 # --------------------------------------------------------------------
-if __name__ == "__main__":
-    opts = Options()
-    opts.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    prefs = {"profile.default_content_setting_values.notifications": 2, "profile.default_content_setting_values.geolocation": 2}
-    opts.add_experimental_option("prefs", prefs)
-    opts.add_argument("--window-size=1920,1080")
-    opts.add_argument("--start-maximized")
-    # opts.add_argument("--headless")
-    opts.add_argument("--disable-gpu")
-    opts.add_argument("--no-sandbox")
-    opts.add_argument("--log-level=3")
-    opts.add_experimental_option("excludeSwitches", ["enable-logging", "enable-automation"])
-    opts.add_experimental_option('useAutomationExtension', False)
-    opts.page_load_strategy = 'eager'
-
-    driver = webdriver.Chrome(options=opts)
-    driver.set_page_load_timeout(40)
+async def scrape_vtex_api(session, pagina, ean_producto):
+    """Consulta la API de catálogo de una tienda VTEX. Devuelve {} si falla o no hay resultados."""
+    print(f"\n--- CONSULTANDO API DE {pagina.upper()} ---")
+    try:
+        url = SITE_CONFIG[pagina]["api_url"].format(q=ean_producto)
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+            resp.raise_for_status()
+            productos = await resp.json(content_type=None)
+        return extraer_datos_vtex(productos, ean_producto)
+    # ValueError cubre JSON inválido y precios no numéricos; el resto, un JSON con otra
+    # forma (null, dict en vez de lista, etc.). En todos los casos se usa el navegador.
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, TypeError, AttributeError, KeyError, IndexError) as e:
+        print(f"  -> Falló la consulta a la API de {pagina}: {e}")
+        return {}
+
+# --------------------------------------------------------------------
+# 8. NAVEGADOR Y CONTEXTOS
+# --------------------------------------------------------------------
+# Imágenes, fuentes, CSS y videos no hacen falta para leer precios; se abortan antes de descargarse.
+RECURSOS_BLOQUEADOS = "**/*.{png,jpg,jpeg,gif,webp,svg,ico,woff,woff2,ttf,otf,css,mp4}"
+# Analítica y publicidad: tampoco aportan nada y sus scripts retrasan la carga.
+HOSTS_BLOQUEADOS = re.compile(r"doubleclick\.net|google-analytics\.com|googletagmanager\.com|facebook\.net")
+
+# Perfil de Chrome persistente: la caché HTTP, las cookies y el JS compilado
+# sobreviven entre ejecuciones, así que la segunda corrida arranca en caliente.
+CHROME_PROFILE_DIR = Path.home() / ".cache" / "price_scrapper_chrome"
+
+async def crear_contexto(playwright):
+    CHROME_PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    # Un perfil persistente solo admite un contexto: todas las farmacias comparten
+    # cookies, pero cada una corre en su propia pestaña.
+    # Notificaciones y geolocalización quedan denegadas por defecto en Playwright.
+    context = await playwright.chromium.launch_persistent_context(
+        str(CHROME_PROFILE_DIR),
+        # channel="chromium" usa el headless nuevo de Chrome en vez del headless shell.
+        channel="chromium",
+        headless=True,
+        # Playwright ya agrega --disable-extensions, --disable-background-networking,
+        # --disable-default-apps, --mute-audio y sus propios --disable-features y
+        # --blink-settings; repetirlos reemplazaría los suyos. Las imágenes ya se
+        # abortan con context.route (RECURSOS_BLOQUEADOS).
+        args=["--disable-gpu", "--no-sandbox", "--disk-cache-size=536870912", "--disable-sync"],
+        ignore_default_args=["--enable-automation"],
+        user_agent=USER_AGENT,
+        viewport={"width": 1920, "height": 1080},
+    )
+    context.set_default_navigation_timeout(40000)
+    await context.route(RECURSOS_BLOQUEADOS, lambda route: route.abort())
+    await context.route(HOSTS_BLOQUEADOS, lambda route: route.abort())
+    return context
+
+async def scrape_farmacia(context, session, farmacia):
+    if "api_url" in SITE_CONFIG[farmacia]:
+        datos = await scrape_vtex_api(session, farmacia, EAN_A_BUSCAR)
+        if datos:
+            return procesar_datos(farmacia, EAN_A_BUSCAR, datos)
+        print(f"  -> La API de {farmacia} no devolvió el producto. Se busca con el navegador...")
+    page = await context.new_page()
+    try:
+        return await scrape(page, farmacia, EAN_A_BUSCAR)
+    except Exception as e:
+        print(f"\nERROR INESPERADO en {farmacia}: {e}")
+        traceback.print_exc()
+    finally:
+        await page.close()
+
+async def scrape_todas():
+    """Scrapea todas las farmacias a la vez con un solo navegador y devuelve las filas en orden."""
+    async with async_playwright() as playwright:
+        context = await crear_contexto(playwright)
+        try:
+            async with aiohttp.ClientSession(headers={"User-Agent": USER_AGENT}) as session:
+                return await asyncio.gather(*(scrape_farmacia(context, session, farmacia) for farmacia in FARMACIAS_A_BUSCAR))
+        finally:
+            await context.close()
 
+# --------------------------------------------------------------------
+# 9. EJECUCIÓN
+# --------------------------------------------------------------------
+if __name__ == "__main__":
     filename = "Precios_Farmacias_Unificado_Final.csv"
     if exists(filename): os.remove(filename)
 
     print("--- INICIANDO SCRAPER UNIFICADO ---")
+    filas = []
     try:
-        for farmacia in FARMACIAS_A_BUSCAR:
-            scrapper_general(farmacia, EAN_A_BUSCAR, driver)
+        filas = asyncio.run(scrape_todas())
     except Exception as e:
         print(f"\nERROR INESPERADO: {e}")
-        import traceback
         traceback.print_exc()
     finally:
-        driver.quit()
         print("\n--- SCRAPER FINALIZADO ---")
 
+    # El CSV se escribe una sola vez al final, en el orden de FARMACIAS_A_BUSCAR.
+    filas = [fila for fila in filas if fila]
+    if filas: write_csv(filename, filas)
+
     if exists(filename) and os.path.getsize(filename) > 0:
-        df = pd.read_csv(filename)
         print("\nContenido del archivo CSV generado:")
-        print(df.to_string())
+        with open(filename, encoding='utf-8') as f:
+            print(f.read())
     else:
         print("\nNo se guardaron datos en el archivo CSV.")
\ No newline at end of file